@@ -1,4 +1,8 @@
 from enum import Enum
+from typing import Optional
+import sys
+
+FONT_TABLE_SIZE = 128  # Шрифты содержат только ASCII-символы
 
 class Color(Enum):
     default = "\033[0m"
@@ -6,7 +10,8 @@ class Color(Enum):
     green = "\033[92m"
     red = "\033[91m"
 class Printer:
-    _font: dict[str, list[str]] = {}
+    _font_cache: dict[int, dict[str, list[str]]] = {}
+    _rendered_cache: dict[tuple[int, str], list[Optional[tuple[str, ...]]]] = {}
 
     def __init__(self, color: Color, size: int, xShift: int, yShift: int, symbol = '*'):
         self.color = color
@@ -16,10 +21,12 @@ class Printer:
         self.symbol = symbol
 
     @classmethod
-    def updateFont(cls, font: int):
+    def updateFont(cls, font: int) -> dict[str, list[str]]:
+        if font in cls._font_cache:
+            return cls._font_cache[font]
         filename = f'font{font}.txt'
+        glyphs: dict[str, list[str]] = {}
         with open(filename, 'r') as f:
-            cls._font.clear()
             while True:
                 line = f.readline()[:-1]
                 if line == '':
@@ -27,30 +34,58 @@ class Printer:
                 if len(line)!=1:
                     raise Exception("Font file build wrong")
                 letter = line
-                cls._font[letter] = []
+                glyphs[letter] = []
                 for i in range(font):
-                    cls._font[letter].append(f.readline()[:-1])
+                    glyphs[letter].append(f.readline()[:-1])
+        cls._font_cache[font] = glyphs
+        return glyphs
+
+    @classmethod
+    def renderedFont(cls, font: int, symbol: str) -> list[Optional[tuple[str, ...]]]:
+        """Таблица готовых строк глифов, индексируемая ord(символа)"""
+        key = (font, symbol)
+        if key not in cls._rendered_cache:
+            table: list[Optional[tuple[str, ...]]] = [None] * FONT_TABLE_SIZE
+            for letter, rows in cls.updateFont(font).items():
+                if ord(letter) < FONT_TABLE_SIZE:
+                    table[ord(letter)] = tuple(row.replace('*', symbol) for row in rows)
+            cls._rendered_cache[key] = table
+        return cls._rendered_cache[key]
 
     def print(self, text: str):
-        self.updateFont(self.size)
+        rendered = self.renderedFont(self.size, self.symbol)
+        xShift, yShift, step = self.xShift, self.yShift, self.size + 1
+        parts = []
+        append = parts.append
         for c in text:
-            if c not in self._font:
+            o = ord(c)
+            rows = rendered[o] if o < FONT_TABLE_SIZE else None
+            if rows is None:
                 continue
-            for i, j in enumerate(self._font[c]):
-                show = j.replace('*', self.symbol)
-                print(f"\033[{self.yShift + i + 1};{self.xShift}H" + show, end="")
-            self.xShift+=self.size+1
+            for i, show in enumerate(rows):
+                append(f"\033[{yShift + i + 1};{xShift}H{show}")
+            xShift+=step
+        self.xShift = xShift
+        sys.stdout.write("".join(parts))
+        sys.stdout.flush()
 
     @classmethod
     def setPrint(cls, text: str, color:Color, size: int,xShift: int, yShift: int, symbol = '*'):
-        cls.updateFont(size)
+        rendered = cls.renderedFont(size, symbol)
+        default_val = Color.default.value
+        color_val = color.value
+        parts = []
+        append = parts.append
         for c in text:
-            if c not in cls._font:
+            o = ord(c)
+            rows = rendered[o] if o < FONT_TABLE_SIZE else None
+            if rows is None:
                 continue
-            for i, j in enumerate(cls._font[c]):
-                show = j.replace('*', symbol)
-                print(f"\033[{yShift + i + 1};{xShift}H" + color.value + show, end=Color.default.value)
+            for i, show in enumerate(rows):
+                append(f"\033[{yShift + i + 1};{xShift}H{color_val}{show}{default_val}")
             xShift+=size+1
+        sys.stdout.write("".join(parts))
+        sys.stdout.flush()
         cls.xShift = xShift
 
     def __enter__(self):
@@ -1,6 +1,16 @@
-from typing import Protocol, List
+from typing import Protocol, List, Optional
+from functools import lru_cache
+import os
+import queue
 import re
 import socket
+import threading
+import time
+
+try:
+    import ahocorasick  # pyahocorasick, необязательная зависимость
+except ImportError:
+    ahocorasick = None
 
 
 # Протоколы
@@ -17,6 +27,12 @@ class LogHandlerProtocol(Protocol):
 
 
 # Фильтры логов
+@lru_cache(maxsize=256)
+def _compile(pattern: str) -> re.Pattern:
+    """Компилирует шаблон один раз; одинаковые шаблоны разделяют один объект"""
+    return re.compile(pattern)
+
+
 class SimpleLogFilter:
     def __init__(self, pattern: str):
         self.pattern = pattern
@@ -25,19 +41,62 @@ class SimpleLogFilter:
         return self.pattern in text
 
 
+class AhoCorasickFilter:
+    """Ищет любую из подстрок за один проход по тексту"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        if ahocorasick is not None:
+            self.A = ahocorasick.Automaton()
+            for p in self.patterns:
+                self.A.add_word(p, p)
+            self.A.make_automaton()
+        else:
+            # Без pyahocorasick: одно объединение экранированных подстрок
+            self.A = None
+            self._regex = _compile("|".join(re.escape(p) for p in self.patterns))
+
+    def match(self, text: str) -> bool:
+        if not self.patterns:
+            return False
+        if self.A is not None:
+            return any(self.A.iter(text))
+        return self._regex.search(text) is not None
+
+
 class ReLogFilter:
     def __init__(self, pattern: str):
         try:
-            self.pattern = re.compile(pattern)  # Может вызвать re.error при невалидном шаблоне
+            self.pattern = _compile(pattern)  # Может вызвать re.error при невалидном шаблоне
         except re.error as e:
             raise ValueError(f"Некорректное регулярное выражение: {e}") from e
 
     def match(self, text: str) -> bool:
-        try:
-            return bool(self.pattern.search(text))
-        except (AttributeError, re.error) as e:
-            print(f"[ReLogFilter ERROR] Ошибка при поиске по шаблону: {e}")
-            return False
+        # Ошибки поиска обрабатываются в Logger.log/log_many
+        return self.pattern.search(text) is not None
+
+
+class CombinedReLogFilter(ReLogFilter):
+    """Объединяет несколько регулярных выражений в одно: текст просматривается один раз"""
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        if not self.patterns:
+            raise ValueError("Нужно хотя бы одно регулярное выражение")
+        compiled = [ReLogFilter(p).pattern for p in self.patterns]
+        # Группы (и ссылки на них) и глобальные флаги вроде (?i) меняют смысл в общем выражении,
+        # поэтому такие шаблоны проверяются по отдельности
+        plain_flags = _compile("").flags
+        merged = [c.pattern for c in compiled if c.groups == 0 and c.flags == plain_flags]
+        self._separate = [c for c in compiled if c.groups or c.flags != plain_flags]
+        self.pattern = None
+        if merged:
+            super().__init__("|".join(f"(?:{p})" for p in merged))
+
+    def match(self, text: str) -> bool:
+        if self.pattern is not None and self.pattern.search(text) is not None:
+            return True
+        return any(c.search(text) is not None for c in self._separate)
 
 
 # Обработчики логов
@@ -45,31 +104,150 @@ class ConsoleHandler:
     def handle(self, text: str) -> None:
         print(text)
 
+    def handle_many(self, texts: List[str]) -> None:
+        print("\n".join(texts))
+
 
 class FileHandler:
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, flush_every: int = 0):
         self.filename = filename
+        self.flush_every = flush_every  # 0 - сбрасывать только при заполнении буфера и в close()
+        self._pending = 0
+        self._fh = open(filename, "ab", buffering=65536)  # Файл открывается один раз
 
     def handle(self, text: str) -> None:
         try:
-            with open(self.filename, 'a') as f:
-                f.write(text + '\n')
+            self._fh.write(text.encode() + b"\n")
+            self._pending += 1
+            if self.flush_every and self._pending >= self.flush_every:
+                self._fh.flush()
+                self._pending = 0
+        except IOError as e:
+            print(f"[FileHandler ERROR] Ошибка при записи в файл: {e}")
+
+    def handle_many(self, texts: List[str]) -> None:
+        try:
+            self._fh.write(("\n".join(texts) + "\n").encode())
+            self._pending += len(texts)
+            if self.flush_every and self._pending >= self.flush_every:
+                self._fh.flush()
+                self._pending = 0
+        except IOError as e:
+            print(f"[FileHandler ERROR] Ошибка при записи в файл: {e}")
+
+    def close(self) -> None:
+        if self._fh.closed:
+            return
+        try:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
         except IOError as e:
             print(f"[FileHandler ERROR] Ошибка при записи в файл: {e}")
+        finally:
+            self._fh.close()
 
 
 class SocketHandler:
-    def __init__(self, host: str, port: int):
+    """TCP-обработчик: строки ставятся в очередь, фоновый поток отправляет их пачками"""
+
+    def __init__(self, host: str, port: int, buffer_size: int = 64 * 1024, flush_interval: float = 0.05):
         self.host = host
         self.port = port
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval  # Сколько поток ждёт новых строк, прежде чем отправить пачку
+        self._sock: Optional[socket.socket] = None  # Соединение открывается лениво и переиспользуется
+        self._buf = bytearray()
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _connect(self) -> socket.socket:
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port))
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        return self._sock
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
 
     def handle(self, text: str) -> None:
+        self._queue.put((text + '\n').encode())
+
+    def handle_many(self, texts: List[str]) -> None:
+        self._queue.put(("\n".join(texts) + "\n").encode())
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            taken = 1
+            if item is None:
+                stop = True
+            else:
+                self._buf += item
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._buf) < self.buffer_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if item is None:
+                        stop = True
+                        break
+                    self._buf += item
+            self._send()
+            for _ in range(taken):
+                self._queue.task_done()
+        self._disconnect()
+
+    def _send(self) -> None:
+        if not self._buf:
+            return
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-                s.connect((self.host, self.port))
-                s.sendall((text + '\n').encode())
+            try:
+                self._connect().sendall(self._buf)
+            except (ConnectionResetError, BrokenPipeError):
+                # Сервер закрыл соединение: переподключаемся и повторяем отправку
+                self._disconnect()
+                self._connect().sendall(self._buf)
         except Exception as e:
+            self._disconnect()
             print(f"[SocketHandler ERROR] Ошибка при отправке данных: {e}")
+        finally:
+            self._buf.clear()
+
+    def flush(self) -> None:
+        """Ждёт, пока фоновый поток отправит всё, что стоит в очереди"""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+
+
+class UdpSyslogHandler:
+    """Syslog по UDP: без соединения и рукопожатия, один sendto на строку"""
+
+    def __init__(self, host: str = "localhost", port: int = 514):
+        self.host = host
+        self.port = port
+        self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def handle(self, text: str) -> None:
+        try:
+            self.s.sendto(text.encode(), (self.host, self.port))
+        except OSError as e:
+            print(f"[UdpSyslogHandler ERROR] Ошибка при отправке данных: {e}")
+
+    def close(self) -> None:
+        self.s.close()
 
 
 class SyslogHandler:
@@ -94,14 +272,31 @@ class Logger:
         except Exception as e:
             print(f"[Logger ERROR] Ошибка при обработке лога: {e}")
 
+    def log_many(self, texts: List[str]) -> None:
+        try:
+            for f in self.filters:
+                texts = [text for text in texts if f.match(text)]
+            if not texts:
+                return
+
+            for h in self.handlers:
+                # handle_many необязателен: обработчику достаточно handle
+                handle_many = getattr(h, "handle_many", None)
+                if handle_many is not None:
+                    handle_many(texts)
+                else:
+                    for text in texts:
+                        h.handle(text)
+        except Exception as e:
+            print(f"[Logger ERROR] Ошибка при обработке лога: {e}")
+
 
 # Тестирование системы
 if __name__ == "__main__":
     # Создание фильтров
-    errorFilter = SimpleLogFilter("ERROR")
-    warningFilter = SimpleLogFilter("WARNING")
+    alertFilter = AhoCorasickFilter(["ERROR", "WARNING"])
     try:
-        httpFilter = ReLogFilter(r"HTTP/\d\.\d")
+        httpFilter = CombinedReLogFilter([r"HTTP/\d\.\d", r"https?://\S+"])
     except ValueError as e:
         print(f"Ошибка создания фильтра: {e}")
         httpFilter = SimpleLogFilter("HTTP")  # Фолбэк на простой фильтр
@@ -113,8 +308,7 @@ if __name__ == "__main__":
     syslogHandler = SyslogHandler()
 
     # Создание логгеров
-    errorLogger = Logger(filters=[errorFilter], handlers=[consoleHandler, fileHandler, syslogHandler])
-    warningLogger = Logger(filters=[warningFilter], handlers=[consoleHandler, fileHandler])
+    alertLogger = Logger(filters=[alertFilter], handlers=[consoleHandler, fileHandler, syslogHandler])
     httpLogger = Logger(filters=[httpFilter], handlers=[consoleHandler, fileHandler, socketHandler])
     defaultLogger = Logger(handlers=[consoleHandler])
 
@@ -128,18 +322,14 @@ if __name__ == "__main__":
     ]
 
     # Демонстрация
-    print("ERROR logs:")
-    for logText in testLogs:
-        errorLogger.log(logText)
-
-    print("\nWARNING logs:")
-    for logText in testLogs:
-        warningLogger.log(logText)
+    print("ERROR/WARNING logs:")
+    alertLogger.log_many(testLogs)
 
     print("\nHTTP logs:")
-    for logText in testLogs:
-        httpLogger.log(logText)
+    httpLogger.log_many(testLogs)
+    socketHandler.close()
 
     print("\nALL logs:")
-    for logText in testLogs:
-        defaultLogger.log(logText)
+    defaultLogger.log_many(testLogs)
+
+    fileHandler.close()
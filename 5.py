@@ -3,11 +3,28 @@ from typing import Protocol, TypeVar, Generic, Sequence, Optional
 import json
 import os
 
+try:
+    import orjson  # Быстрый JSON, если установлен
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _loads(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 # Тип-переменная
 T = TypeVar("T")
 
 # ========== Класс User ==========
-@dataclass(order=True)
+@dataclass(order=True, slots=True)
 class User:
     id: int
     name: str
@@ -29,29 +46,84 @@ class UserRepositoryProtocol(DataRepositoryProtocol[User], Protocol):
 
 # ========== Универсальный репозиторий ==========
 class DataRepository(Generic[T]):
-    def __init__(self, path: str):
+    """Хранит записи в журнале JSON Lines: каждое изменение - одна дописанная строка"""
+
+    def __init__(self, path: str, compact_threshold: int = 1 << 20):
         self.path = path
-        self._items: list[dict] = []
+        self.compact_threshold = compact_threshold  # размер журнала в байтах, после которого он сжимается
+        self._by_id: dict[int, dict] = {}  # id -> запись; порядок вставки сохраняется
+        self._loaded = False  # Без успешной загрузки compact() затёр бы непрочитанный журнал
         try:
             self._load()
-        except (json.JSONDecodeError, IOError) as e:
+            self._loaded = True
+        except (ValueError, KeyError, IOError) as e:
             print(f"Ошибка загрузки данных: {e}")
-            self._items = []
+            self._by_id = {}
+        self._reindex()
+        self._fh = open(self.path, "ab")
+        self._compact_at = self.compact_threshold
 
     def _load(self):
-        if os.path.exists(self.path):
-            with open(self.path, "r", encoding="utf-8") as f:
-                self._items = json.load(f)
-        else:
-            self._items = []
+        # Повтор журнала: поздние строки перекрывают ранние, {"op": "del"} удаляет запись
+        self._by_id = {}
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offset = 0  # Конец последней целой строки
+        for line in data.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("строка не дописана")
+                if line.strip():
+                    d = _loads(line)
+                    if d.get("op") == "del":
+                        self._by_id.pop(d["id"], None)
+                    else:
+                        self._by_id[d["id"]] = d
+            except (ValueError, KeyError):
+                if offset + len(line) < len(data):
+                    raise
+                # Оборванная при сбое последняя строка отбрасывается, чтобы новые записи не приклеились к ней
+                print(f"Отброшена недописанная последняя строка журнала {self.path}")
+                os.truncate(self.path, offset)
+                break
+            offset += len(line)
 
-    def _save(self):
+    def _append(self, record: dict):
         try:
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(self._items, f, ensure_ascii=False, indent=2)
+            self._fh.write(_dumps(record) + b"\n")
+            self._fh.flush()
+            if self._fh.tell() > self._compact_at:
+                self.compact()
         except IOError as e:
             print(f"Ошибка сохранения данных: {e}")
 
+    def compact(self) -> None:
+        """Переписывает журнал, оставляя по одной строке на актуальную запись"""
+        if not self._loaded:
+            raise IOError(f"Журнал {self.path} не был загружен, сжатие потеряло бы его записи")
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(_dumps(d) + b"\n" for d in self._by_id.values()))
+        self._fh.close()
+        os.replace(tmp, self.path)
+        self._fh = open(self.path, "ab")
+        self._compact_at = max(self.compact_threshold, 2 * self._fh.tell())
+
+    def close(self) -> None:
+        self._fh.close()
+
+    # Дополнительные индексы поверх _by_id переопределяются в наследниках
+    def _reindex(self) -> None:
+        pass
+
+    def _index(self, d: dict) -> None:
+        pass
+
+    def _unindex(self, d: dict) -> None:
+        pass
+
     def _serialize(self, obj: T) -> dict:
         return asdict(obj)
 
@@ -59,44 +131,79 @@ class DataRepository(Generic[T]):
         raise NotImplementedError
 
     def get_all(self) -> Sequence[T]:
-        return [self._deserialize(d) for d in self._items]
+        return [self._deserialize(d) for d in self._by_id.values()]
 
     def get_by_id(self, id: int) -> Optional[T]:
-        for d in self._items:
-            if d["id"] == id:
-                return self._deserialize(d)
-        return None
+        d = self._by_id.get(id)
+        return self._deserialize(d) if d is not None else None
 
     def add(self, item: T) -> None:
-        if self.get_by_id(item.id):
+        if item.id in self._by_id:
             raise ValueError(f"Элемент с id={item.id} уже существует.")
-        self._items.append(self._serialize(item))
-        self._save()
+        d = self._serialize(item)
+        self._by_id[item.id] = d
+        self._index(d)
+        self._append(d)
 
     def update(self, item: T) -> None:
-        for i, d in enumerate(self._items):
-            if d["id"] == item.id:
-                self._items[i] = self._serialize(item)
-                self._save()
-                return
-        raise ValueError(f"Элемент с id={item.id} не найден.")
+        old = self._by_id.get(item.id)
+        if old is None:
+            raise ValueError(f"Элемент с id={item.id} не найден.")
+        self._unindex(old)
+        d = self._serialize(item)
+        self._by_id[item.id] = d
+        self._index(d)
+        self._append(d)
 
     def delete(self, item: T) -> None:
-        initial_len = len(self._items)
-        self._items = [d for d in self._items if d["id"] != item.id]
-        if len(self._items) < initial_len:
-            self._save()
+        d = self._by_id.pop(item.id, None)
+        if d is not None:
+            self._unindex(d)
+            self._append({"op": "del", "id": item.id})
 
 # ========== Репозиторий пользователей ==========
 class UserRepository(DataRepository[User], UserRepositoryProtocol):
+    def _reindex(self) -> None:
+        # Как и при поиске перебором, по логину находится первая запись
+        self._by_login: dict[str, dict] = {}
+        self._dup_logins: set[str] = set()  # Логины, которые встречаются у нескольких записей
+        for d in self._by_id.values():
+            if self._by_login.setdefault(d["login"], d) is not d:
+                self._dup_logins.add(d["login"])
+
+    def _first_by_login(self, login: str, skip: Optional[dict] = None) -> Optional[dict]:
+        return next((d for d in self._by_id.values() if d["login"] == login and d is not skip), None)
+
+    def _index(self, d: dict) -> None:
+        login = d["login"]
+        if login not in self._by_login:
+            self._by_login[login] = d
+        else:
+            self._dup_logins.add(login)
+            self._by_login[login] = self._first_by_login(login)
+
+    def _unindex(self, d: dict) -> None:
+        login = d["login"]
+        if self._by_login.get(login) is not d:
+            return
+        first = self._first_by_login(login, skip=d) if login in self._dup_logins else None
+        if first is not None:
+            self._by_login[login] = first
+        else:
+            del self._by_login[login]
+            self._dup_logins.discard(login)
+
+    def _serialize(self, u: User) -> dict:
+        # У User нет вложенных dataclass, поэтому asdict с его глубоким копированием не нужен
+        return {"id": u.id, "name": u.name, "login": u.login, "password": u.password,
+                "email": u.email, "address": u.address}
+
     def _deserialize(self, d: dict) -> User:
         return User(**d)
 
     def get_by_login(self, login: str) -> Optional[User]:
-        for d in self._items:
-            if d["login"] == login:
-                return self._deserialize(d)
-        return None
+        d = self._by_login.get(login)
+        return self._deserialize(d) if d is not None else None
 
 # ========== Протокол авторизации ==========
 class AuthServiceProtocol(Protocol):
@@ -138,7 +245,7 @@ class AuthService(AuthServiceProtocol):
 # ========== Пример использования ==========
 def main():
     try:
-        repo = UserRepository("users.json")
+        repo = UserRepository("users.ndjson")
         auth = AuthService(repo)
 
         if auth.is_authorized:
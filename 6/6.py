@@ -1,130 +1,385 @@
+import atexit
 import json
+import os
+import queue
+import sys
+import threading
+from collections import deque
 from abc import ABC, abstractmethod
 
+try:
+    import orjson  # Быстрый JSON, если установлен
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def _loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+LOG_FILE = "output.log"
+LOG_FLUSH_EVERY = 32  # сбрасывать буфер лога каждые N записей
+OUT_FLUSH_EVERY = 64  # сбрасывать stdout каждые N символов или на переводе строки
+UNDO_LIMIT = 10_000  # максимальная глубина истории undo/redo
+
+
+# Общий файл лога для всех команд, открывается один раз;
+# строки копятся в _LOG_BUFFER и уходят в файл одним системным вызовом
+_LOG_FD = os.open(LOG_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+_LOG_BUFFER: deque[bytes] = deque()
+
+
+def _append_log(text: str):
+    _LOG_BUFFER.append(text.encode("utf-8") + b"\n")
+    if len(_LOG_BUFFER) >= LOG_FLUSH_EVERY:
+        _flush_log()
+
+
+def _flush_log():
+    if not _LOG_BUFFER:
+        return
+    if not hasattr(os, "writev"):  # Windows
+        data = b"".join(_LOG_BUFFER)
+        _LOG_BUFFER.clear()
+        _LOG_BUFFER.append(data)
+    # Ядро может принять только часть данных: из буфера убирается лишь записанное
+    while _LOG_BUFFER:
+        if hasattr(os, "writev"):
+            written = os.writev(_LOG_FD, list(_LOG_BUFFER))  # Строки передаются ядру без склейки
+        else:
+            written = os.write(_LOG_FD, _LOG_BUFFER[0])
+        while written:
+            head = _LOG_BUFFER[0]
+            if written < len(head):
+                _LOG_BUFFER[0] = head[written:]
+                break
+            written -= len(head)
+            _LOG_BUFFER.popleft()
+
+
+atexit.register(_flush_log)
+
+_out_pending = 0
+
+
+def _write_out(text: str):
+    # Вывод команд без накладных расходов print(); input() сам сбрасывает stdout перед чтением
+    global _out_pending
+    sys.stdout.write(text)
+    _out_pending += len(text)
+    if _out_pending >= OUT_FLUSH_EVERY or text.endswith("\n"):
+        sys.stdout.flush()
+        _out_pending = 0
+
 # ---------------- Паттерн Command ----------------
 class Command(ABC):
+    __slots__ = ()
+    has_char = False  # Команда печатает символ и хранит его в атрибуте char
+    _log = staticmethod(_append_log)  # Единая точка записи в общий лог для всех команд
+
     @abstractmethod
     def execute(self): ...
     @abstractmethod
     def undo(self): ...
 
 class PrintCommand(Command):
-    def __init__(self, text_output: list, char: str):
+    __slots__ = ("text_output", "char", "_encoded")
+    has_char = True
+
+    def __init__(self, text_output: bytearray, char: str):
         self.text_output = text_output
         self.char = char
+        self._encoded = char.encode("utf-8")
 
     def execute(self):
-        self.text_output.append(self.char)
-        print(self.char, end="")
+        self.text_output.extend(self._encoded)
+        _write_out(self.char)
         self._log(self.char)
 
     def undo(self):
         if self.text_output:
-            self.text_output.pop()
-            print("\b \b", end="")
+            del self.text_output[-len(self._encoded):]
+            _write_out("\b \b")
             self._log("undo")
 
-    def _log(self, text):
-        with open("output.log", "a", encoding="utf-8") as f:
-            f.write(text + "\n")
-
 class VolumeUpCommand(Command):
+    __slots__ = ("percent",)
+
     def __init__(self):
         self.percent = 20
 
     def execute(self):
         msg = f"volume increased +{self.percent}%"
-        print(msg)
+        _write_out(msg + "\n")
         self._log("ctrl++")
 
     def undo(self):
         msg = f"volume decreased -{self.percent}%"
-        print(msg)
+        _write_out(msg + "\n")
         self._log("undo")
 
-    def _log(self, text):
-        with open("output.log", "a", encoding="utf-8") as f:
-            f.write(text + "\n")
-
 class VolumeDownCommand(Command):
+    __slots__ = ("percent",)
+
     def __init__(self):
         self.percent = 20
 
     def execute(self):
         msg = f"volume decreased -{self.percent}%"
-        print(msg)
+        _write_out(msg + "\n")
         self._log("ctrl+-")
 
     def undo(self):
         msg = f"volume increased +{self.percent}%"
-        print(msg)
+        _write_out(msg + "\n")
         self._log("undo")
 
-    def _log(self, text):
-        with open("output.log", "a", encoding="utf-8") as f:
-            f.write(text + "\n")
-
 class MediaPlayerCommand(Command):
+    __slots__ = ("launched",)
+
     def __init__(self):
         self.launched = False
 
     def execute(self):
         self.launched = True
         msg = "media player launched"
-        print(msg)
+        _write_out(msg + "\n")
         self._log("ctrl+p")
 
     def undo(self):
         if self.launched:
             msg = "media player closed"
-            print(msg)
+            _write_out(msg + "\n")
             self._log("undo")
 
-    def _log(self, text):
-        with open("output.log", "a", encoding="utf-8") as f:
-            f.write(text + "\n")
-
 # ---------------- Паттерн Memento ----------------
 class KeyboardMemento:
+    __slots__ = ("state",)
+
     def __init__(self, state: dict):
         self.state = state  # Просто хранит состояние, ничего не зная о командах
 
+    def to_bytes(self) -> bytes:
+        return _dumps(self.state)
+
     def to_json(self):
-        return json.dumps(self.state)
+        return self.to_bytes().decode("utf-8")
 
     @staticmethod
-    def from_json(data: str):
-        state = json.loads(data)
-        return KeyboardMemento(state)
+    def from_json(data: str | bytes):
+        return KeyboardMemento(_loads(data))
 
 class StateSaver:
-    def __init__(self, filepath="bindings.json"):
+    """Снимок состояния в filepath плюс журнал привязок walpath, дописываемый по одной строке"""
+
+    def __init__(self, filepath="bindings.json", walpath="bindings.wal"):
         self.filepath = filepath
+        self.walpath = walpath
+        self._wal = None
+        self._wal_base = 0  # Сколько байт журнала уже отрезано: отметки не сдвигаются после обрезки
+        self._last_hash = None  # Хэш последнего записанного снимка: неизменный не переписывается
+        self._lock = threading.Lock()  # save может выполняться в фоновом потоке Keyboard
+
+    def save_bind(self, key: str, cmd_data: dict):
+        if any(c in key for c in "\t\n\r"):
+            raise ValueError(f"Недопустимый символ в имени клавиши: {key!r}")
+        with self._lock:
+            if self._wal is None:
+                self._wal = open(self.walpath, "ab")
+            self._wal.write(key.encode("utf-8") + b"\t" + _dumps(cmd_data) + b"\n")
+            self._wal.flush()
+
+    def wal_offset(self) -> int:
+        """Текущий конец журнала: строки до него уже учтены в снимке, взятом сейчас"""
+        with self._lock:
+            if self._wal is not None:
+                return self._wal_base + self._wal.tell()
+            try:
+                return self._wal_base + os.path.getsize(self.walpath)
+            except FileNotFoundError:
+                return self._wal_base
+
+    def save(self, memento: KeyboardMemento, wal_offset: int | None = None):
+        with self._lock:
+            self._save(memento, wal_offset)
+
+    def _save(self, memento: KeyboardMemento, wal_offset: int | None):
+        data = memento.to_bytes()
+        h = hash(data)
+        if h != self._last_hash:
+            self._write_atomic(self.filepath, data)
+            self._last_hash = h
+        self._trim_wal(wal_offset)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        # Запись во временный файл и атомарная подмена: сбой не оставит недописанный файл
+        tmp = path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            # Байты пишутся напрямую, без слоя TextIOWrapper; os.write может записать не всё
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)  # Данные должны быть на диске до подмены файла
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+
+    def _trim_wal(self, upto: int | None):
+        # Снимок поглощает строки журнала до отметки upto (None - весь журнал);
+        # строки, дописанные после того, как снимок был взят, сохраняются
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        try:
+            with open(self.walpath, "rb") as f:
+                wal = f.read()
+        except FileNotFoundError:
+            wal = b""
+        cut = len(wal) if upto is None else min(len(wal), max(0, upto - self._wal_base))
+        rest = wal[cut:]
+        self._wal_base += cut
+        if rest:
+            self._write_atomic(self.walpath, rest)
+        else:
+            open(self.walpath, "wb").close()
 
-    def save(self, memento: KeyboardMemento):
-        with open(self.filepath, "w", encoding="utf-8") as f:
-            f.write(memento.to_json())
+    def close(self):
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
 
     def load(self):
         try:
-            with open(self.filepath, "r", encoding="utf-8") as f:
-                return KeyboardMemento.from_json(f.read())
+            with open(self.filepath, "rb") as f:
+                data = f.read()
+            self._last_hash = hash(data)
+            memento = KeyboardMemento.from_json(data)
+        except FileNotFoundError:
+            memento = KeyboardMemento({})
+        try:
+            with open(self.walpath, "rb") as f:
+                wal = f.read()
         except FileNotFoundError:
-            return KeyboardMemento({})
+            wal = b""
+        offset = 0  # Конец последней целой строки журнала
+        for line in wal.splitlines(keepends=True):
+            # Более поздние строки журнала перекрывают ранние
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("строка не дописана")
+                key, _, cmd_data = line.partition(b"\t")
+                memento.state.setdefault('bindings', {})[key.decode("utf-8")] = _loads(cmd_data)
+            except ValueError:
+                if offset + len(line) < len(wal):
+                    raise
+                # Оборванная при сбое последняя строка отбрасывается, чтобы следующая не приклеилась к ней
+                os.truncate(self.walpath, offset)
+                break
+            offset += len(line)
+        return memento
 
 # ---------------- Основной класс Keyboard ----------------
+# Восстановление команд из состояния по имени типа
+_CMD_FACTORIES = {
+    "PrintCommand": lambda d, kb: kb.print_command(d['char']),
+    "VolumeUpCommand": lambda d, kb: VolumeUpCommand(),
+    "VolumeDownCommand": lambda d, kb: VolumeDownCommand(),
+    "MediaPlayerCommand": lambda d, kb: MediaPlayerCommand(),
+}
+
 class Keyboard:
+    __slots__ = ("bindings", "undo_stack", "redo_stack", "text_output", "saver", "_dirty", "_bind_fragments",
+                 "_save_q", "_save_error", "_saver_thread", "_print_commands")
+
     def __init__(self):
         self.bindings = {}
-        self.undo_stack = []
-        self.redo_stack = []
-        self.text_output = []
+        # Ограниченные стеки: самые старые записи вытесняются
+        self.undo_stack: deque[Command] = deque(maxlen=UNDO_LIMIT)
+        self.redo_stack: deque[Command] = deque(maxlen=UNDO_LIMIT)
+        self.text_output = bytearray()  # Набранный текст в UTF-8
+        self._print_commands: dict[str, PrintCommand] = {}
         self.saver = StateSaver()
+        self._dirty = False
+        self._bind_fragments: dict[str, dict] = {}  # Готовое описание каждой привязки для снимка
+        # Снимки пишет фоновый поток; в очереди ждёт не больше одного, самого свежего
+        self._save_q: queue.Queue[tuple[dict, int] | None] = queue.Queue(maxsize=1)
+        self._save_error: Exception | None = None  # Ошибка фоновой записи, передаётся вызывающему
+        self._saver_thread: threading.Thread | None = None  # Запускается при первом снимке, останавливается в close()
         self._load_state()
 
     def bind(self, key: str, command: Command):
+        fragment = self._command_state(command)
+        self.saver.save_bind(key, fragment)  # Проверяет имя клавиши до изменения привязок
         self.bindings[key] = command
-        self._save_state()
+        self._bind_fragments[key] = fragment
+        self._dirty = True  # Полный снимок пишется один раз в flush_state()
+
+    def flush_state(self, wait: bool = True):
+        """Записывает снимок состояния и ждёт окончания записи.
+        При wait=False снимок только ставится в очередь фоновому потоку и к возврату может быть
+        ещё не записан; ошибка такой записи поднимется при следующем flush_state() или close()"""
+        self._raise_save_error()
+        if self._dirty:
+            self._save_state()
+            self._dirty = False
+        if wait:
+            self._save_q.join()
+            self._raise_save_error()
+
+    def close(self):
+        try:
+            self.flush_state()
+        finally:
+            thread, self._saver_thread = self._saver_thread, None
+            if thread is not None:
+                self._save_q.put(None)  # Сигнал остановки фоновому потоку
+                thread.join()
+            self.saver.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _saver_loop(self):
+        # Поток не должен завершаться из-за ошибки: иначе очередь некому разбирать и join() зависнет
+        while True:
+            item = self._save_q.get()
+            if item is None:
+                self._save_q.task_done()
+                return
+            snapshot, wal_offset = item
+            try:
+                self.saver.save(KeyboardMemento(snapshot), wal_offset)
+            except Exception as e:
+                self._save_error = e
+            finally:
+                self._save_q.task_done()
+
+    def _raise_save_error(self):
+        error, self._save_error = self._save_error, None
+        if error is not None:
+            self._dirty = True  # Снимок не записан: следующий flush_state повторит попытку
+            raise error
+
+    def print_command(self, char: str) -> PrintCommand:
+        # Команда не хранит состояния нажатия, поэтому на каждый символ хватает одного экземпляра
+        cmd = self._print_commands.get(char)
+        if cmd is None:
+            cmd = self._print_commands[char] = PrintCommand(self.text_output, char)
+        return cmd
 
     def press(self, key: str):
         cmd = self.bindings.get(key)
@@ -132,9 +387,6 @@ class Keyboard:
             print(f"No command bound to '{key}'")
             return
 
-        if isinstance(cmd, PrintCommand):
-            cmd = PrintCommand(self.text_output, cmd.char)
-
         cmd.execute()
         self.undo_stack.append(cmd)
         self.redo_stack.clear()
@@ -146,6 +398,7 @@ class Keyboard:
         cmd = self.undo_stack.pop()
         cmd.undo()
         self.redo_stack.append(cmd)
+        _flush_log()
 
     def redo(self):
         if not self.redo_stack:
@@ -154,59 +407,66 @@ class Keyboard:
         cmd = self.redo_stack.pop()
         cmd.execute()
         self.undo_stack.append(cmd)
+        _flush_log()
+
+    @staticmethod
+    def _command_state(cmd: Command) -> dict:
+        return {
+            'type': type(cmd).__name__,
+            'char': cmd.char if cmd.has_char else None
+        }
 
     def _save_state(self):
         state = {
-            'bindings': {
-                key: {
-                    'type': type(cmd).__name__,
-                    'char': cmd.char if isinstance(cmd, PrintCommand) else None
-                }
-                for key, cmd in self.bindings.items()
-            },
-            'text_output': self.text_output
+            'bindings': dict(self._bind_fragments),
+            'text_output': self.text_output.decode("utf-8")
         }
-        self.saver.save(KeyboardMemento(state))
+        if self._saver_thread is None:
+            self._saver_thread = threading.Thread(target=self._saver_loop, daemon=True)
+            self._saver_thread.start()
+        # Более старый, ещё не записанный снимок заменяется новым
+        try:
+            self._save_q.get_nowait()
+            self._save_q.task_done()
+        except queue.Empty:
+            pass
+        # Отметка журнала берётся вместе со снимком: более поздние привязки в него не вошли
+        self._save_q.put((state, self.saver.wal_offset()))
 
     def _load_state(self):
         memento = self.saver.load()
         if not memento.state:
             return
 
-        self.text_output = memento.state.get('text_output', [])
+        # Текст хранится одной строкой; старые снимки содержат список символов
+        # Буфер заполняется на месте: команды печати уже ссылаются на него
+        self.text_output[:] = "".join(memento.state.get('text_output', "")).encode("utf-8")
         
         for key, cmd_data in memento.state.get('bindings', {}).items():
-            cmd_type = cmd_data['type']
-            if cmd_type == "PrintCommand":
-                self.bindings[key] = PrintCommand(self.text_output, cmd_data['char'])
-            elif cmd_type == "VolumeUpCommand":
-                self.bindings[key] = VolumeUpCommand()
-            elif cmd_type == "VolumeDownCommand":
-                self.bindings[key] = VolumeDownCommand()
-            elif cmd_type == "MediaPlayerCommand":
-                self.bindings[key] = MediaPlayerCommand()
+            factory = _CMD_FACTORIES.get(cmd_data['type'])
+            if factory is not None:
+                self.bindings[key] = factory(cmd_data, self)
+                self._bind_fragments[key] = cmd_data
 
 # ---------------- Точка входа ----------------
 def main():
     print("=== Виртуальная клавиатура ===")
-    kb = Keyboard()
-
-    kb.bind("a", PrintCommand(kb.text_output, "a"))
-    kb.bind("b", PrintCommand(kb.text_output, "b"))
-    kb.bind("ctrl++", VolumeUpCommand())
-    kb.bind("ctrl+-", VolumeDownCommand())
-    kb.bind("ctrl+p", MediaPlayerCommand())
-
-    while True:
-        key = input("Введите клавишу (или 'undo', 'redo', 'exit'): ").strip()
-        if key == "exit":
-            break
-        elif key == "undo":
-            kb.undo()
-        elif key == "redo":
-            kb.redo()
-        else:
-            kb.press(key)
+    # Состояние сохраняется один раз при выходе из блока with
+    with Keyboard() as kb:
+        kb.bind("a", kb.print_command("a"))
+        kb.bind("b", kb.print_command("b"))
+        kb.bind("ctrl++", VolumeUpCommand())
+        kb.bind("ctrl+-", VolumeDownCommand())
+        kb.bind("ctrl+p", MediaPlayerCommand())
+
+        # Служебные команды; любая другая клавиша передаётся в press
+        actions = {"undo": lambda k: kb.undo(), "redo": lambda k: kb.redo()}
+        while True:
+            key = input("Введите клавишу (или 'undo', 'redo', 'exit'): ").strip()
+            if key == "exit":
+                _flush_log()
+                break
+            actions.get(key, kb.press)(key)
 
 if __name__ == "__main__":
     main()
@@ -9,11 +9,27 @@ class LifeStyle:
     SCOPED = "Scoped"
     SINGLETON = "Singleton"
 
+class Registration:
+    __slots__ = ("implementation", "life_style", "params", "factory", "resolver")
+
+    def __init__(self,
+                 implementation: Type[T] | Callable[..., T],
+                 life_style: str,
+                 params: Dict[str, Any],
+                 factory: Callable[[], T]):
+        self.implementation = implementation
+        self.life_style = life_style
+        self.params = params
+        self.factory = factory
+        self.resolver = factory
+
 class Injector:
+    # Подсказки типов конструктора для каждой реализации, общие для всех инжекторов
+    _hints_cache: Dict[Callable, Dict[str, Type]] = {}
+
     def __init__(self):
-        self._registrations: Dict[Type, Dict] = {}
+        self._registrations: Dict[Type, Registration] = {}
         self._scoped_instances: Dict[Type, Any] = {}
-        self._singleton_instances: Dict[Type, Any] = {}
         self._in_scope = False
 
     def register(self,
@@ -24,59 +40,77 @@ class Injector:
         if interface_type in self._registrations:
             raise ValueError(f"Тип {interface_type.__name__} уже зарегистрирован")
 
-        self._registrations[interface_type] = {
-            'implementation': implementation,
-            'life_style': life_style,
-            'params': params or {}
-        }
+        params = params or {}
+        registration = Registration(implementation, life_style, params,
+                                    self._compile_factory(implementation, params))
+        registration.resolver = self._make_resolver(interface_type, registration)
+        self._registrations[interface_type] = registration
 
     def get_instance(self, interface_type: Type[T]) -> T:
-        if interface_type not in self._registrations:
+        registration = self._registrations.get(interface_type)
+        if registration is None:
             raise ValueError(f"Тип {interface_type.__name__} не зарегистрирован")
-
-        registration = self._registrations[interface_type]
-        life_style = registration['life_style']
-        implementation = registration['implementation']
-        params = registration['params']
-
-        if life_style == LifeStyle.SINGLETON:
-            if interface_type not in self._singleton_instances:
-                self._singleton_instances[interface_type] = self._create_instance(implementation, params)
-            return self._singleton_instances[interface_type]
-
-        elif life_style == LifeStyle.SCOPED:
-            if not self._in_scope:
-                raise RuntimeError("Невозможно получить Scoped экземпляр вне области видимости Scope")
-            if interface_type not in self._scoped_instances:
-                self._scoped_instances[interface_type] = self._create_instance(implementation, params)
-            return self._scoped_instances[interface_type]
+        return registration.resolver()
+
+    def _make_resolver(self, interface_type: Type[T], registration: Registration) -> Callable[[], T]:
+        factory = registration.factory
+        if registration.life_style == LifeStyle.SINGLETON:
+            def resolve_singleton() -> T:
+                instance = factory()
+                # Дальше регистрация просто возвращает готовый экземпляр
+                registration.resolver = lambda: instance
+                return instance
+            return resolve_singleton
+
+        elif registration.life_style == LifeStyle.SCOPED:
+            def resolve_scoped() -> T:
+                if not self._in_scope:
+                    raise RuntimeError("Невозможно получить Scoped экземпляр вне области видимости Scope")
+                if interface_type not in self._scoped_instances:
+                    self._scoped_instances[interface_type] = factory()
+                return self._scoped_instances[interface_type]
+            return resolve_scoped
 
         else:  # PerRequest
-            return self._create_instance(implementation, params)
-
-    def _create_instance(self, implementation: Type[T] | Callable[..., T], params: Dict[str, Any]) -> T:
+            return factory
+
+    @staticmethod
+    def _constructor_hints(implementation: Type[T] | Callable[..., T]) -> Dict[str, Type]:
+        hints = Injector._hints_cache.get(implementation)
+        if hints is None:
+            try:
+                if isinstance(implementation, type):
+                    hints = get_type_hints(implementation.__init__)
+                else:
+                    hints = get_type_hints(implementation)
+            except (TypeError, AttributeError):
+                hints = {}
+            hints.pop('return', None)
+            Injector._hints_cache[implementation] = hints
+        return hints
+
+    def _compile_factory(self, implementation: Type[T] | Callable[..., T], params: Dict[str, Any]) -> Callable[[], T]:
+        """Собирает функцию создания экземпляра, чтобы не разбирать подсказки типов при каждом вызове"""
         if callable(implementation) and not isinstance(implementation, type):
             # Фабричный метод
-            return implementation(**params)
-
-        try:
-            if isinstance(implementation, type):
-                constructor_params = get_type_hints(implementation.__init__)
-            else:
-                constructor_params = get_type_hints(implementation)
-        except (TypeError, AttributeError):
-            constructor_params = {}
-
-        args = {}
-        for param_name, param_type in constructor_params.items():
-            if param_name == 'return':
-                continue
-            if param_name in params:
-                args[param_name] = params[param_name]
-            elif param_type in self._registrations:
-                args[param_name] = self.get_instance(param_type)
-
-        return implementation(**args)
+            return lambda: implementation(**params)
+
+        plan = None  # (готовые аргументы из params, [(имя, тип) зависимостей]); строится при первом вызове
+
+        def make() -> T:
+            nonlocal plan
+            if plan is None:
+                hints = self._constructor_hints(implementation)
+                plan = ({name: params[name] for name in hints if name in params},
+                        [(name, typ) for name, typ in hints.items() if name not in params])
+            fixed, dependencies = plan
+            args = dict(fixed)
+            for name, typ in dependencies:
+                if typ in self._registrations:
+                    args[name] = self.get_instance(typ)
+            return implementation(**args)
+
+        return make
 
     def scope(self):
         return self.ScopeContext(self)